@@ -1,9 +1,16 @@
 import os
-import json
+import gzip
 import logging
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, make_response
 from gemini_processor import process_with_gemini
-from storage_handler import store_document, get_user_credentials, save_document_to_gcs
+from storage_handler import (
+    store_document, get_user_credentials, save_document_to_gcs,
+    get_profile_metadata, get_profile_content
+)
+from scheduler import generation_scheduler, SchedulerRejected
+from payload_validator import (
+    PayloadError, read_request_body, parse_process_payload, validate_user_id, MAX_PAYLOAD_BYTES
+)
 from dotenv import load_dotenv
 from functools import wraps
 
@@ -17,6 +24,9 @@ logging.basicConfig(level=logging.DEBUG)
 env_mode = os.environ.get("ENVIRONMENT", "production")
 logging.info(f"Running in {env_mode} mode")
 
+# Bucket holding the generated memorial profiles
+PROFILE_BUCKET = "memorial-voices"
+
 # Middleware for API key validation
 def require_api_key(f):
     @wraps(f)
@@ -44,6 +54,7 @@ def require_api_key(f):
 # Initialize Flask application
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
+app.config["MAX_CONTENT_LENGTH"] = MAX_PAYLOAD_BYTES
 
 @app.route('/')
 def index():
@@ -58,38 +69,25 @@ def process_document():
         if os.environ.get("ENVIRONMENT") != "development":
             # Minimal logging in production
             logging.info("Received processing request")
-            data = request.get_json(silent=True)
         else:
             # More verbose logging in development
             logging.debug(f"Request content type: {request.content_type}")
-            data = request.get_json(silent=True)
-            logging.debug("Received JSON data")
-        
-        # Check for nested data structure
-        if 'data' in data and isinstance(data['data'], dict):
-            nested_data = data['data']
-            
-            # Extract user ID without logging
-            user_id = nested_data.get('userID') or nested_data.get('user_id') or nested_data.get('userId')
-            
-            # Get template data (JSON array)
-            template_data = nested_data.get('template', [])
-            if template_data:
-                # Convert template data to JSON string for Gemini
-                json_data = json.dumps(template_data)
-            else:
-                json_data = '[]'
-        else:
-            # Extract from top level
-            user_id = data.get('userID') or data.get('user_id') or data.get('userId')
-            json_data = data.get('json_data', '[]')
-        
-        if not user_id:
-            # Generic error without details
-            return jsonify({"status": "error", "message": "Invalid request parameters"}), 400
-        
-        # Process with Gemini - synchronously
-        result = process_with_gemini(json_data)
+
+        # Reject oversized or malformed bodies before any Gemini spend
+        try:
+            raw_body = read_request_body(request)
+            user_id, reflections, priority = parse_process_payload(
+                raw_body, priority=request.headers.get('X-Priority')
+            )
+        except PayloadError as e:
+            logging.warning(f"Rejected request payload: {e.message}")
+            return jsonify({"status": "error", "message": e.message}), e.status_code
+
+        # Process with Gemini - synchronously, once the scheduler grants a slot
+        try:
+            result = generation_scheduler.run(user_id, priority, process_with_gemini, reflections)
+        except SchedulerRejected as e:
+            return jsonify({"status": "error", "message": e.message}), e.status_code
         
         if not result:
             logging.error("Failed to generate document content")
@@ -97,7 +95,7 @@ def process_document():
         
         # Save to GCS
         document_url = save_document_to_gcs(
-            bucket_name="memorial-voices",
+            bucket_name=PROFILE_BUCKET,
             user_id=user_id,
             document_content=result
         )
@@ -117,11 +115,77 @@ def process_document():
         logging.error(f"Error in process_document: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": "Processing request failed"}), 500
 
+def _identity_etag(etag):
+    """ETag for the decompressed representation of a gzip-stored profile."""
+    return f"{etag}-identity"
+
+@app.route('/api/profile/<user_id>', methods=['GET'])
+@require_api_key
+def get_profile(user_id):
+    """Return a stored memorial profile, honouring conditional GET headers."""
+    try:
+        try:
+            user_id = validate_user_id(user_id)
+        except PayloadError as e:
+            return jsonify({"status": "error", "message": e.message}), e.status_code
+        
+        # Metadata only - the body is not downloaded unless it is needed
+        metadata = get_profile_metadata(PROFILE_BUCKET, user_id)
+        if not metadata:
+            return jsonify({"status": "error", "message": "Profile not found"}), 404
+        
+        # The gzip and decompressed bodies are different representations, so
+        # the decompressed one gets its own strong validator
+        accepts_gzip = request.accept_encodings["gzip"] > 0
+        etag, identity_etag = metadata["etag"], _identity_etag(metadata["etag"])
+        
+        not_modified = False
+        if request.if_none_match:
+            not_modified = (request.if_none_match.contains_weak(etag)
+                            or request.if_none_match.contains_weak(identity_etag))
+        elif request.if_modified_since and metadata["last_modified"]:
+            not_modified = metadata["last_modified"].replace(microsecond=0) <= request.if_modified_since
+        
+        if not_modified:
+            response = make_response("", 304)
+        else:
+            content, metadata = get_profile_content(PROFILE_BUCKET, user_id, metadata)
+            if content is None:
+                return jsonify({"status": "error", "message": "Profile not found"}), 404
+            
+            response = make_response(content, 200)
+            response.content_type = "text/plain; charset=utf-8"
+            
+            if metadata["content_encoding"] == "gzip":
+                # Pass the stored gzip bytes through when the client accepts them
+                if accepts_gzip:
+                    response.content_encoding = "gzip"
+                else:
+                    response.set_data(gzip.decompress(content))
+        
+        is_identity = metadata["content_encoding"] == "gzip" and not accepts_gzip
+        response.set_etag(_identity_etag(metadata["etag"]) if is_identity else metadata["etag"])
+        response.last_modified = metadata["last_modified"]
+        response.vary.add("Accept-Encoding")
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    
+    except Exception as e:
+        logging.error(f"Error in get_profile: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": "Failed to retrieve profile"}), 500
+
 @app.route('/api/test', methods=['GET'])
 @require_api_key
 def test_auth():
     return jsonify({"status": "success", "message": "Authentication successful"}), 200
 
+@app.route('/api/metrics', methods=['GET'])
+@require_api_key
+def scheduler_metrics():
+    """Report per-lane queue wait and latency for the generation scheduler."""
+    return jsonify({"status": "success", "scheduler": generation_scheduler.stats()}), 200
+
 @app.errorhandler(404)
 def page_not_found(e):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -130,6 +194,10 @@ def page_not_found(e):
 def method_not_allowed(e):
     return jsonify({"error": "Method not allowed"}), 405
 
+@app.errorhandler(413)
+def payload_too_large(e):
+    return jsonify({"error": "Payload too large"}), 413
+
 @app.errorhandler(500)
 def server_error(e):
     return jsonify({"error": "Internal server error"}), 500
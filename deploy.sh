@@ -11,6 +11,9 @@ MEMORY="512Mi"
 CPU="1"
 MIN_INSTANCES=0
 MAX_INSTANCES=10
+# Requests per instance; keep equal to gunicorn --threads so overflow is
+# routed to another instance instead of queueing in the accept backlog
+CONCURRENCY=8
 
 # Colors for output
 RED='\033[0;31m'
@@ -72,6 +75,7 @@ gcloud run deploy ${SERVICE_NAME} \
   --cpu ${CPU} \
   --min-instances ${MIN_INSTANCES} \
   --max-instances ${MAX_INSTANCES} \
+  --concurrency ${CONCURRENCY} \
   --allow-unauthenticated
 
 echo -e "\n${GREEN}Deployment complete!${NC}"
@@ -3,13 +3,14 @@ import os
 import json
 from google import genai
 from google.genai import types
+from json_codec import dumps_json
 
 def process_with_gemini(json_data, continue_from=None, user_info=None):
     """
     Process JSON data with Gemini AI model using Google Vertex AI.
     
     Args:
-        json_data (str): JSON string to be inserted into the prompt
+        json_data (list | str): Parsed reflections list, or a JSON string, to be inserted into the prompt
         continue_from (str, optional): Text to continue from if previous response was cut off
         user_info (str, optional): User information string containing name and DOB
         
@@ -35,6 +36,10 @@ def process_with_gemini(json_data, continue_from=None, user_info=None):
             location="us-central1",
         )
         
+        # Parsed reflections are encoded once, straight into the prompt text
+        if not isinstance(json_data, str):
+            json_data = dumps_json(json_data)
+
         # User information section to include in prompt if provided
         user_info_section = f"\nUser Information: {user_info}\n" if user_info else ""
         
@@ -0,0 +1,44 @@
+import json
+
+# orjson is optional; it parses and encodes several times faster than the
+# standard library, so use it when installed and fall back otherwise.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment image
+    orjson = None
+
+
+def loads_json(raw):
+    """
+    Parse JSON from bytes or str using the fastest available parser.
+
+    Args:
+        raw (bytes | str): Serialized JSON
+
+    Returns:
+        The decoded Python structure
+
+    Raises:
+        ValueError: If the input is not valid JSON
+    """
+    try:
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+    except TypeError as e:
+        raise ValueError(str(e))
+
+
+def dumps_json(data):
+    """
+    Serialize a structure to a compact JSON string using the fastest available encoder.
+
+    Args:
+        data: JSON-compatible structure
+
+    Returns:
+        str: Compact JSON text
+    """
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
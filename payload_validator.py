@@ -0,0 +1,166 @@
+import os
+import logging
+from json_codec import loads_json
+from scheduler import PRIORITY_LANES, DEFAULT_PRIORITY
+
+# Upper bound for the raw request body, checked before the body is buffered
+MAX_PAYLOAD_BYTES = int(os.environ.get("MAX_PAYLOAD_BYTES", 2 * 1024 * 1024))
+
+# Upper bound on the number of reflections accepted in a single template
+MAX_TEMPLATE_ITEMS = int(os.environ.get("MAX_TEMPLATE_ITEMS", 1000))
+
+MAX_USER_ID_LENGTH = 128
+
+REFLECTION_FIELDS = ("section", "question", "answer")
+
+
+class PayloadError(ValueError):
+    """Raised when a request body is rejected before any processing happens."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _parse_json(raw):
+    """Parse JSON with the fast codec, mapping decode errors to a 400."""
+    try:
+        return loads_json(raw)
+    except ValueError:
+        raise PayloadError("Malformed JSON body")
+
+
+def read_request_body(req, limit=MAX_PAYLOAD_BYTES):
+    """
+    Read the raw body of a request without buffering more than the size limit.
+
+    The declared Content-Length is checked first so oversized uploads are
+    rejected without reading them; chunked bodies are read up to the limit.
+
+    Args:
+        req: The Flask request object
+        limit (int): Maximum number of bytes accepted
+
+    Returns:
+        bytes: The raw request body
+
+    Raises:
+        PayloadError: If the body is too large, empty or not JSON
+    """
+    if not req.is_json:
+        raise PayloadError("Content-Type must be application/json", 415)
+
+    content_length = req.content_length
+    if content_length is not None and content_length > limit:
+        raise PayloadError("Payload too large", 413)
+
+    body = req.stream.read(limit + 1)
+    if len(body) > limit:
+        raise PayloadError("Payload too large", 413)
+    if not body:
+        raise PayloadError("Empty request body")
+
+    return body
+
+
+def validate_user_id(user_id):
+    """
+    Normalize the user ID and make sure it is safe to use in a storage path.
+
+    Args:
+        user_id (str | int): User ID from the request
+
+    Returns:
+        str: The normalized user ID
+
+    Raises:
+        PayloadError: If the user ID is missing or not a safe path segment
+    """
+    if isinstance(user_id, bool) or not isinstance(user_id, (str, int)):
+        raise PayloadError("Invalid request parameters")
+
+    user_id = str(user_id).strip()
+    if not user_id or len(user_id) > MAX_USER_ID_LENGTH:
+        raise PayloadError("Invalid request parameters")
+    if "/" in user_id or "\\" in user_id or user_id in (".", ".."):
+        raise PayloadError("Invalid request parameters")
+    if any(ord(ch) < 32 for ch in user_id):
+        raise PayloadError("Invalid request parameters")
+
+    return user_id
+
+
+def _validate_template(template):
+    """Check that the template is a non-empty, bounded list of reflection objects."""
+    if not isinstance(template, list):
+        raise PayloadError("Template must be a JSON array")
+    if not template:
+        raise PayloadError("Template must contain at least one reflection")
+    if len(template) > MAX_TEMPLATE_ITEMS:
+        raise PayloadError("Template contains too many items")
+
+    for item in template:
+        if not isinstance(item, dict):
+            raise PayloadError("Template items must be JSON objects")
+        for field in REFLECTION_FIELDS:
+            value = item.get(field)
+            if value is not None and not isinstance(value, str):
+                raise PayloadError(f"Template field '{field}' must be a string")
+
+    return template
+
+
+def _validate_priority(priority):
+    """Map the requested priority onto one of the scheduler lanes."""
+    if priority is None or priority == "":
+        return DEFAULT_PRIORITY
+    if not isinstance(priority, str) or priority.strip().lower() not in PRIORITY_LANES:
+        raise PayloadError(f"Priority must be one of: {', '.join(PRIORITY_LANES)}")
+    return priority.strip().lower()
+
+
+def parse_process_payload(raw, priority=None):
+    """
+    Parse and validate the body of a /api/process request.
+
+    Two shapes are accepted:
+        {"data": {"userID": ..., "template": [...], "priority": ...}}
+        {"userID": ..., "json_data": "[...]" | [...], "priority": ...}
+
+    Args:
+        raw (bytes | str): The raw request body
+        priority (str, optional): Priority from the X-Priority header, which takes
+                                  precedence over the body field
+
+    Returns:
+        tuple: (user_id, reflections, priority) where reflections is the parsed
+               template list and priority is one of the scheduler lanes
+
+    Raises:
+        PayloadError: If the body is malformed or fails validation
+    """
+    data = _parse_json(raw)
+    if not isinstance(data, dict):
+        raise PayloadError("Request body must be a JSON object")
+
+    # Check for nested data structure
+    if isinstance(data.get("data"), dict):
+        nested_data = data["data"]
+        user_id = nested_data.get("userID") or nested_data.get("user_id") or nested_data.get("userId")
+        reflections = nested_data.get("template", [])
+        body_priority = nested_data.get("priority", data.get("priority"))
+    else:
+        user_id = data.get("userID") or data.get("user_id") or data.get("userId")
+        reflections = data.get("json_data", [])
+        body_priority = data.get("priority")
+        # Legacy clients send the template pre-serialized as a string
+        if isinstance(reflections, str):
+            reflections = _parse_json(reflections)
+
+    user_id = validate_user_id(user_id)
+    reflections = _validate_template(reflections)
+    priority = _validate_priority(priority or body_priority)
+
+    logging.debug(f"Validated {priority} payload with {len(reflections)} reflections")
+    return user_id, reflections, priority
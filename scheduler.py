@@ -0,0 +1,328 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Priority lanes, highest priority first
+PRIORITY_LANES = ("interactive", "background", "batch")
+DEFAULT_PRIORITY = "interactive"
+
+# Maximum number of concurrent Gemini generations across all users
+MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", 4))
+
+# Maximum number of concurrent Gemini generations for a single user
+MAX_PER_USER = int(os.environ.get("GEMINI_MAX_PER_USER", max(1, MAX_CONCURRENCY // 2)))
+
+# Seconds a request may wait in the queue before it is rejected
+QUEUE_TIMEOUT = float(os.environ.get("SCHEDULER_QUEUE_TIMEOUT", 300))
+
+# Seconds of waiting after which a queued request is promoted one lane, so
+# lower lanes are not starved by steady interactive load
+AGING_INTERVAL = float(os.environ.get("SCHEDULER_AGING_SECONDS", 30))
+
+# Slots only interactive requests may use, so background and batch load can
+# never fill the scheduler and make interactive requests wait
+INTERACTIVE_RESERVED = int(os.environ.get("SCHEDULER_INTERACTIVE_RESERVED", 1))
+
+# Queued requests each park a gunicorn thread, so the queue is bounded to the
+# threads left over after MAX_CONCURRENCY (8 threads - 4 slots by default).
+# Requests beyond these limits are rejected instead of waiting.
+# The per-user limit applies separately in each lane.
+MAX_QUEUED_PER_USER = int(os.environ.get("SCHEDULER_MAX_QUEUED_PER_USER", 1))
+MAX_QUEUED_PER_LANE = {
+    "interactive": int(os.environ.get("SCHEDULER_MAX_QUEUED_INTERACTIVE", 2)),
+    "background": int(os.environ.get("SCHEDULER_MAX_QUEUED_BACKGROUND", 1)),
+    "batch": int(os.environ.get("SCHEDULER_MAX_QUEUED_BATCH", 1)),
+}
+
+# Number of recent samples kept per lane for the latency percentiles
+METRICS_WINDOW = 500
+
+
+class SchedulerRejected(Exception):
+    """Raised when a request is not given a generation slot."""
+
+    def __init__(self, message, status_code=503):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class SchedulerTimeout(SchedulerRejected):
+    """Raised when a request waits longer than the queue timeout for a slot."""
+
+
+class _Ticket:
+    """A single request waiting for, or holding, a generation slot."""
+
+    __slots__ = ("user_id", "lane", "enqueued_at", "granted")
+
+    def __init__(self, user_id, lane):
+        self.user_id = user_id
+        self.lane = lane
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class _LaneStats:
+    """Rolling queue wait and latency samples for one priority lane."""
+
+    def __init__(self, window):
+        self.waits = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)
+        self.completed = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+
+def _percentile(samples, pct):
+    """Return the nearest-rank percentile of the samples, or None when empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+class GenerationScheduler:
+    """
+    Gate calls to Gemini behind priority lanes with per-user fair queuing.
+
+    Slots are handed out to the highest priority lane that has a waiting
+    request, where every ``aging_interval`` seconds of waiting promotes a
+    request by one lane. Within a lane, users are served round-robin so one
+    user's bulk submission cannot starve others, and no user holds more than
+    ``max_per_user`` slots at once. ``interactive_reserved`` slots are kept
+    for the interactive lane: background and batch requests are only
+    dispatched while more than that many slots are free.
+
+    Waiting requests block their thread, so the queue is bounded per user in
+    each lane and per lane; requests over those bounds are rejected immediately.
+
+    Limits apply to this process only. With several instances behind a load
+    balancer each instance enforces its own limits.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_per_user=MAX_PER_USER,
+                 queue_timeout=QUEUE_TIMEOUT, aging_interval=AGING_INTERVAL,
+                 interactive_reserved=INTERACTIVE_RESERVED, max_queued_per_user=MAX_QUEUED_PER_USER, max_queued_per_lane=None,
+                 window=METRICS_WINDOW):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_per_user = max(1, max_per_user)
+        self.queue_timeout = queue_timeout
+        self.aging_interval = aging_interval
+        self.interactive_reserved = min(max(0, interactive_reserved), self.max_concurrency - 1)
+        self.max_queued_per_user = max(0, max_queued_per_user)
+        self.max_queued_per_lane = dict(MAX_QUEUED_PER_LANE)
+        self.max_queued_per_lane.update(max_queued_per_lane or {})
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._user_in_flight = {}
+        # (lane, user_id) -> number of queued tickets
+        self._user_queued = {}
+        self._lane_queued = {lane: 0 for lane in PRIORITY_LANES}
+        # lane -> OrderedDict(user_id -> deque of tickets), ordered for round-robin
+        self._queues = {lane: OrderedDict() for lane in PRIORITY_LANES}
+        self._stats = {lane: _LaneStats(window) for lane in PRIORITY_LANES}
+
+    @contextmanager
+    def slot(self, user_id, priority=DEFAULT_PRIORITY):
+        """
+        Hold a generation slot for the duration of the ``with`` block.
+
+        Args:
+            user_id (str): User the work is done for, used for fair queuing
+            priority (str): One of PRIORITY_LANES
+
+        Raises:
+            SchedulerRejected: If the user or lane queue is full (429 / 503)
+            SchedulerTimeout: If no slot became available within the queue timeout
+        """
+        lane = priority if priority in PRIORITY_LANES else DEFAULT_PRIORITY
+        ticket = self._acquire(user_id, lane)
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(ticket, time.monotonic() - started_at)
+
+    def run(self, user_id, priority, func, *args, **kwargs):
+        """Run ``func`` once a slot is available and return its result."""
+        with self.slot(user_id, priority):
+            return func(*args, **kwargs)
+
+    def _acquire(self, user_id, lane):
+        ticket = _Ticket(user_id, lane)
+        deadline = None
+        if self.queue_timeout:
+            deadline = ticket.enqueued_at + self.queue_timeout
+
+        with self._cond:
+            self._enqueue(ticket)
+            self._dispatch()
+
+            # Admission control: only park the thread if the queues have room
+            if not ticket.granted:
+                if self._user_queued[(lane, user_id)] > self.max_queued_per_user:
+                    self._reject(ticket, "Too many queued requests for this user", 429)
+                if self._lane_queued[lane] > self.max_queued_per_lane[lane]:
+                    self._reject(ticket, f"Generation queue full in {lane} lane", 503)
+
+            while not ticket.granted:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._discard(ticket)
+                    # Timed-out waits count towards the queue wait percentiles
+                    self._stats[lane].waits.append(time.monotonic() - ticket.enqueued_at)
+                    self._stats[lane].timed_out += 1
+                    logging.warning(f"Scheduler timeout in {lane} lane")
+                    raise SchedulerTimeout(f"No generation slot available in {lane} lane")
+                self._cond.wait(remaining)
+
+            wait = time.monotonic() - ticket.enqueued_at
+            self._stats[lane].waits.append(wait)
+
+        logging.debug(f"Scheduler granted {lane} slot after {wait:.3f}s in queue")
+        return ticket
+
+    def _release(self, ticket, latency):
+        with self._cond:
+            self._in_flight -= 1
+            remaining = self._user_in_flight.get(ticket.user_id, 1) - 1
+            if remaining > 0:
+                self._user_in_flight[ticket.user_id] = remaining
+            else:
+                self._user_in_flight.pop(ticket.user_id, None)
+
+            stats = self._stats[ticket.lane]
+            stats.latencies.append(latency)
+            stats.completed += 1
+
+            self._dispatch()
+
+    def _enqueue(self, ticket):
+        self._queues[ticket.lane].setdefault(ticket.user_id, deque()).append(ticket)
+        self._lane_queued[ticket.lane] += 1
+        key = (ticket.lane, ticket.user_id)
+        self._user_queued[key] = self._user_queued.get(key, 0) + 1
+
+    def _dequeued(self, ticket):
+        """Update the queue counters once a ticket has left its queue."""
+        self._lane_queued[ticket.lane] -= 1
+        key = (ticket.lane, ticket.user_id)
+        remaining = self._user_queued.get(key, 1) - 1
+        if remaining > 0:
+            self._user_queued[key] = remaining
+        else:
+            self._user_queued.pop(key, None)
+
+    def _reject(self, ticket, message, status_code):
+        """Drop a ticket that was refused admission. Caller must hold the lock."""
+        self._discard(ticket)
+        self._stats[ticket.lane].rejected += 1
+        logging.warning(f"Scheduler rejected request in {ticket.lane} lane: {message}")
+        raise SchedulerRejected(message, status_code)
+
+    def _discard(self, ticket):
+        """Remove a ticket that gave up waiting from its queue."""
+        users = self._queues[ticket.lane]
+        tickets = users.get(ticket.user_id)
+        if tickets is None or ticket not in tickets:
+            return
+        tickets.remove(ticket)
+        if not tickets:
+            del users[ticket.user_id]
+        self._dequeued(ticket)
+
+    def _dispatch(self):
+        """Grant free slots to waiting tickets. Caller must hold the lock."""
+        granted = False
+        while self._in_flight < self.max_concurrency:
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+            ticket.granted = True
+            self._in_flight += 1
+            self._user_in_flight[ticket.user_id] = self._user_in_flight.get(ticket.user_id, 0) + 1
+            granted = True
+
+        if granted:
+            self._cond.notify_all()
+
+    def _next_ticket(self):
+        """
+        Pick the next ticket by effective lane, then by age.
+
+        Each lane offers the head ticket of its first user under the per-user
+        cap, which gives round-robin across users. A ticket's effective lane
+        is its own lane minus one for every ``aging_interval`` it has waited.
+        Lanes other than interactive are skipped while only the reserved
+        interactive slots are free.
+        """
+        now = time.monotonic()
+        reserved_only = self._in_flight >= self.max_concurrency - self.interactive_reserved
+        best = None
+        for index, lane in enumerate(PRIORITY_LANES):
+            if reserved_only and lane != "interactive":
+                continue
+            for user_id, tickets in self._queues[lane].items():
+                if self._user_in_flight.get(user_id, 0) >= self.max_per_user:
+                    continue
+                ticket = tickets[0]
+                effective = index
+                if self.aging_interval:
+                    effective = max(0, index - int((now - ticket.enqueued_at) // self.aging_interval))
+                key = (effective, ticket.enqueued_at)
+                if best is None or key < best[0]:
+                    best = (key, ticket)
+                break
+
+        if best is None:
+            return None
+
+        ticket = best[1]
+        users = self._queues[ticket.lane]
+        tickets = users.pop(ticket.user_id)
+        tickets.popleft()
+        # Re-append the user at the back so others get the next turn
+        if tickets:
+            users[ticket.user_id] = tickets
+        self._dequeued(ticket)
+        return ticket
+
+    def stats(self):
+        """
+        Snapshot of scheduler state and per-lane queue wait / latency.
+
+        Returns:
+            dict: Current concurrency plus, for each lane, queue depth, completed and
+                  timed-out counts, and p50/p95 queue wait and latency in seconds
+        """
+        with self._cond:
+            lanes = {}
+            for lane in PRIORITY_LANES:
+                stats = self._stats[lane]
+                lanes[lane] = {
+                    "queued": self._lane_queued[lane],
+                    "completed": stats.completed,
+                    "timed_out": stats.timed_out,
+                    "rejected": stats.rejected,
+                    "queue_wait_p50": _percentile(stats.waits, 50),
+                    "queue_wait_p95": _percentile(stats.waits, 95),
+                    "latency_p50": _percentile(stats.latencies, 50),
+                    "latency_p95": _percentile(stats.latencies, 95),
+                }
+
+            return {
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "max_per_user": self.max_per_user,
+                "interactive_reserved": self.interactive_reserved,
+                "lanes": lanes,
+            }
+
+
+# Shared scheduler for the generation path
+generation_scheduler = GenerationScheduler()
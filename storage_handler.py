@@ -1,13 +1,27 @@
 import os
+import gzip
 import json
 import logging
 import tempfile
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
 from google.cloud import storage
+from google.api_core.exceptions import NotFound, PreconditionFailed
 import google.auth
 import datetime
 
+# Number of profiles kept in the in-process read cache
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", 64))
+
+# user_id -> dict(etag, content, content_encoding), least recently used first
+_profile_cache = OrderedDict()
+_profile_cache_lock = threading.Lock()
+
+_storage_client = None
+_storage_client_lock = threading.Lock()
+
 def store_document(user_id, document_content):
     """
     Store the generated document in a GCP bucket, or in a local file as fallback.
@@ -234,16 +248,13 @@ def save_document_to_gcs(bucket_name, user_id, document_content):
         str: The URL of the saved file or None if error
     """
     try:
-        from google.cloud import storage
-        
-        # Create storage client
-        storage_client = storage.Client()
+        storage_client = _get_storage_client()
         
         # Get bucket
         bucket = storage_client.bucket(bucket_name)
         
         # Define file path with profile_description folder and include userID in filename
-        file_path = f"{user_id}/profile_description/{user_id}_memorial_profile.txt"
+        file_path = _profile_blob_path(user_id)
         
         # Create a blob object
         blob = bucket.blob(file_path)
@@ -254,12 +265,23 @@ def save_document_to_gcs(bucket_name, user_id, document_content):
         else:
             logging.info(f"Creating new file in profile_description folder for user {user_id}")
         
-        # Upload the document content
+        # Upload the document gzip-compressed; GCS serves it decompressed to
+        # clients that do not send Accept-Encoding: gzip
+        compressed_content = gzip.compress(document_content.encode("utf-8"))
+        blob.content_encoding = "gzip"
         blob.upload_from_string(
-            document_content, 
-            content_type="text/plain"
+            compressed_content, 
+            content_type="text/plain; charset=utf-8"
         )
         
+        # Seed the read cache with the freshly written profile
+        if blob.etag:
+            _cache_profile(user_id, {
+                "etag": blob.etag,
+                "content": compressed_content,
+                "content_encoding": "gzip"
+            })
+        
         # Instead of using make_public(), which uses legacy ACLs, 
         # create a signed URL or construct a public URL if the bucket is already public
         try:
@@ -293,3 +315,107 @@ def save_document_to_gcs(bucket_name, user_id, document_content):
     except Exception as e:
         logging.error(f"Error saving document to GCS: {str(e)}", exc_info=True)
         return None
+
+
+def _get_storage_client():
+    """Return a storage client shared across requests, creating it on first use."""
+    global _storage_client
+    if _storage_client is None:
+        with _storage_client_lock:
+            if _storage_client is None:
+                _storage_client = storage.Client()
+    return _storage_client
+
+def _profile_blob_path(user_id):
+    """Path of the memorial profile object for a user."""
+    return f"{user_id}/profile_description/{user_id}_memorial_profile.txt"
+
+def _cache_profile(user_id, entry):
+    """Insert a profile into the read cache, evicting the least recently used."""
+    with _profile_cache_lock:
+        _profile_cache[user_id] = entry
+        _profile_cache.move_to_end(user_id)
+        while len(_profile_cache) > PROFILE_CACHE_SIZE:
+            _profile_cache.popitem(last=False)
+
+def get_profile_metadata(bucket_name, user_id):
+    """
+    Fetch the metadata of a user's memorial profile without downloading it.
+    
+    Args:
+        bucket_name (str): Name of the GCS bucket
+        user_id (str): User ID used to locate the file
+        
+    Returns:
+        dict: Dictionary containing etag, last_modified, generation and content_encoding,
+              or None if the profile does not exist
+    """
+    bucket = _get_storage_client().bucket(bucket_name)
+    blob = bucket.get_blob(_profile_blob_path(user_id))
+    
+    if blob is None:
+        with _profile_cache_lock:
+            _profile_cache.pop(user_id, None)
+        return None
+    
+    return {
+        "etag": blob.etag,
+        "last_modified": blob.updated,
+        "generation": blob.generation,
+        "content_encoding": blob.content_encoding
+    }
+
+def get_profile_content(bucket_name, user_id, metadata):
+    """
+    Return the stored bytes of a user's memorial profile, served from the
+    in-process cache when its ETag still matches the object metadata.
+    
+    If the profile is rewritten between reading the metadata and the download,
+    the metadata is re-read once and the new generation is served instead.
+    
+    Args:
+        bucket_name (str): Name of the GCS bucket
+        user_id (str): User ID used to locate the file
+        metadata (dict): Result of get_profile_metadata for the same profile
+        
+    Returns:
+        tuple: (content, metadata) where content is the object body exactly as
+               stored (gzip-compressed when metadata["content_encoding"] is "gzip")
+               and metadata describes the generation that was returned, or
+               (None, None) if the profile was deleted in the meantime
+    """
+    with _profile_cache_lock:
+        entry = _profile_cache.get(user_id)
+        if entry and entry["etag"] == metadata["etag"]:
+            _profile_cache.move_to_end(user_id)
+            logging.debug(f"Profile cache hit for user {user_id}")
+            return entry["content"], metadata
+    
+    try:
+        content = _download_profile(bucket_name, user_id, metadata)
+    except (PreconditionFailed, NotFound):
+        logging.info(f"Profile for user {user_id} changed during read, re-reading metadata")
+        metadata = get_profile_metadata(bucket_name, user_id)
+        if not metadata:
+            return None, None
+        content = _download_profile(bucket_name, user_id, metadata)
+    
+    _cache_profile(user_id, {
+        "etag": metadata["etag"],
+        "content": content,
+        "content_encoding": metadata["content_encoding"]
+    })
+    
+    return content, metadata
+
+def _download_profile(bucket_name, user_id, metadata):
+    """Download the profile generation described by the metadata."""
+    bucket = _get_storage_client().bucket(bucket_name)
+    blob = bucket.blob(_profile_blob_path(user_id))
+    
+    # raw_download keeps gzip objects compressed; pinning the generation makes
+    # sure the body matches the ETag we are about to cache it under
+    return blob.download_as_bytes(
+        raw_download=True,
+        if_generation_match=metadata["generation"]
+    )
@@ -0,0 +1,147 @@
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import json_codec
+from payload_validator import (
+    PayloadError, MAX_TEMPLATE_ITEMS, parse_process_payload, read_request_body, validate_user_id
+)
+
+REFLECTION = {"section": "Life Overview", "question": "How would you describe your life?", "answer": "Full"}
+
+
+def _request(body, is_json=True, content_length="auto"):
+    """Minimal stand-in for the attributes read_request_body uses."""
+    if content_length == "auto":
+        content_length = len(body)
+    return SimpleNamespace(is_json=is_json, content_length=content_length, stream=io.BytesIO(body))
+
+
+def _payload(**nested):
+    data = {"userID": "user-1", "template": [REFLECTION]}
+    data.update(nested)
+    return json.dumps({"data": data})
+
+
+def _status(func, *args, **kwargs):
+    with pytest.raises(PayloadError) as error:
+        func(*args, **kwargs)
+    return error.value.status_code
+
+
+def test_read_request_body_returns_body_within_limit():
+    assert read_request_body(_request(b'{"a": 1}'), limit=16) == b'{"a": 1}'
+
+
+def test_read_request_body_rejects_declared_oversized_body_without_reading():
+    req = _request(b"{}", content_length=1024)
+    assert _status(read_request_body, req, limit=16) == 413
+    assert req.stream.tell() == 0
+
+
+def test_read_request_body_rejects_oversized_streamed_body():
+    req = _request(b"x" * 64, content_length=None)
+    assert _status(read_request_body, req, limit=16) == 413
+
+
+def test_read_request_body_rejects_non_json_content_type():
+    assert _status(read_request_body, _request(b"{}", is_json=False)) == 415
+
+
+def test_read_request_body_rejects_empty_body():
+    assert _status(read_request_body, _request(b"")) == 400
+
+
+def test_parse_nested_payload():
+    user_id, reflections, priority = parse_process_payload(_payload())
+    assert user_id == "user-1"
+    assert reflections == [REFLECTION]
+    assert priority == "interactive"
+
+
+def test_parse_legacy_json_data_string():
+    body = json.dumps({"user_id": 42, "json_data": json.dumps([REFLECTION])})
+    assert parse_process_payload(body) == ("42", [REFLECTION], "interactive")
+
+
+def test_header_priority_overrides_body_field():
+    body = _payload(priority="batch")
+    assert parse_process_payload(body)[2] == "batch"
+    assert parse_process_payload(body, priority="Background")[2] == "background"
+
+
+@pytest.mark.parametrize("body", [
+    "{",
+    "[]",
+    "null",
+    json.dumps({"json_data": "[not json"}),
+])
+def test_malformed_or_non_object_body_is_rejected(body):
+    assert _status(parse_process_payload, body) == 400
+
+
+@pytest.mark.parametrize("user_id", [None, "", "   ", True, 1.5, "a/b", "..", "a\\b", "a\nb", "x" * 129])
+def test_bad_or_unsafe_user_id_is_rejected(user_id):
+    assert _status(parse_process_payload, _payload(userID=user_id)) == 400
+
+
+def test_validate_user_id_normalizes():
+    assert validate_user_id(" abc ") == "abc"
+    assert validate_user_id(7) == "7"
+
+
+@pytest.mark.parametrize("template", [0, "", False, {}, None, [], ["text"]])
+def test_bad_or_empty_template_is_rejected(template):
+    assert _status(parse_process_payload, _payload(template=template)) == 400
+
+
+def test_missing_template_is_rejected():
+    body = json.dumps({"data": {"userID": "user-1"}})
+    assert _status(parse_process_payload, body) == 400
+
+
+def test_too_many_items_is_a_bad_request():
+    template = [REFLECTION] * (MAX_TEMPLATE_ITEMS + 1)
+    assert _status(parse_process_payload, _payload(template=template)) == 400
+
+
+@pytest.mark.parametrize("field", ["section", "question", "answer"])
+def test_non_string_reflection_field_is_rejected(field):
+    reflection = dict(REFLECTION, **{field: 5})
+    assert _status(parse_process_payload, _payload(template=[reflection])) == 400
+
+
+def test_null_answer_is_accepted():
+    reflection = dict(REFLECTION, answer=None)
+    assert parse_process_payload(_payload(template=[reflection]))[1] == [reflection]
+
+
+@pytest.mark.parametrize("priority", ["urgent", 3])
+def test_bad_priority_is_rejected(priority):
+    assert _status(parse_process_payload, _payload(priority=priority)) == 400
+
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def codec(request, monkeypatch):
+    if request.param == "orjson":
+        monkeypatch.setattr(json_codec, "orjson", pytest.importorskip("orjson"))
+    else:
+        monkeypatch.setattr(json_codec, "orjson", None)
+    return json_codec
+
+
+def test_codec_round_trip(codec):
+    data = [{"section": "Love", "answer": "café"}]
+    encoded = codec.dumps_json(data)
+    assert isinstance(encoded, str)
+    assert " " not in encoded
+    assert codec.loads_json(encoded) == data
+    assert codec.loads_json(encoded.encode("utf-8")) == data
+
+
+@pytest.mark.parametrize("raw", ["{", b"\xff", None])
+def test_codec_rejects_invalid_input_with_value_error(codec, raw):
+    with pytest.raises(ValueError):
+        codec.loads_json(raw)
@@ -0,0 +1,205 @@
+import gzip
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("google.cloud.storage")
+pytest.importorskip("google.genai")
+
+from google.api_core.exceptions import NotFound, PreconditionFailed  # noqa: E402
+
+import app as app_module  # noqa: E402
+import storage_handler  # noqa: E402
+
+API_KEY = "test-key"
+USER_ID = "user-1"
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeStore:
+    """In-memory stand-in for the objects in the profile bucket."""
+
+    def __init__(self):
+        self.objects = {}
+        self.downloads = []
+        self.before_download = None
+
+    def put(self, user_id, text, generation):
+        self.objects[storage_handler._profile_blob_path(user_id)] = {
+            "content": gzip.compress(text.encode("utf-8")),
+            "etag": f"etag-{generation}",
+            "generation": generation,
+            "updated": BASE_TIME + timedelta(seconds=generation),
+            "content_encoding": "gzip",
+        }
+
+
+class FakeBlob:
+    def __init__(self, store, name):
+        self._store = store
+        self.name = name
+        obj = store.objects.get(name, {})
+        self.etag = obj.get("etag")
+        self.generation = obj.get("generation")
+        self.updated = obj.get("updated")
+        self.content_encoding = obj.get("content_encoding")
+
+    def download_as_bytes(self, raw_download=False, if_generation_match=None):
+        if self._store.before_download:
+            hook, self._store.before_download = self._store.before_download, None
+            hook()
+        self._store.downloads.append(if_generation_match)
+
+        obj = self._store.objects.get(self.name)
+        if obj is None:
+            raise NotFound("object deleted")
+        if if_generation_match is not None and obj["generation"] != if_generation_match:
+            raise PreconditionFailed("generation changed")
+        assert raw_download
+        return obj["content"]
+
+
+class FakeBucket:
+    def __init__(self, store):
+        self._store = store
+
+    def get_blob(self, name):
+        if name not in self._store.objects:
+            return None
+        return FakeBlob(self._store, name)
+
+    def blob(self, name):
+        return FakeBlob(self._store, name)
+
+
+class FakeClient:
+    def __init__(self, store):
+        self._store = store
+
+    def bucket(self, name):
+        return FakeBucket(self._store)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(storage_handler, "_get_storage_client", lambda: FakeClient(store))
+    storage_handler._profile_cache.clear()
+    yield store
+    storage_handler._profile_cache.clear()
+
+
+@pytest.fixture
+def client(monkeypatch, store):
+    monkeypatch.setenv("API_KEY", API_KEY)
+    return app_module.app.test_client()
+
+
+def _get(client, **headers):
+    headers["X-API-KEY"] = API_KEY
+    return client.get(f"/api/profile/{USER_ID}", headers=headers)
+
+
+def test_gzip_client_gets_stored_bytes_and_gzip_etag(client, store):
+    store.put(USER_ID, "hello", 1)
+
+    response = _get(client, **{"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == b"hello"
+    assert response.headers["ETag"] == '"etag-1"'
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.last_modified == BASE_TIME + timedelta(seconds=1)
+
+
+@pytest.mark.parametrize("accept_encoding", [None, "gzip;q=0", "br"])
+def test_other_clients_get_decompressed_body_and_identity_etag(client, store, accept_encoding):
+    store.put(USER_ID, "hello", 1)
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+
+    response = _get(client, **headers)
+
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.data == b"hello"
+    assert response.headers["ETag"] == '"etag-1-identity"'
+
+
+@pytest.mark.parametrize("etag", ['"etag-1"', '"etag-1-identity"', 'W/"etag-1"'])
+def test_matching_if_none_match_returns_304_without_download(client, store, etag):
+    store.put(USER_ID, "hello", 1)
+
+    response = _get(client, **{"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert store.downloads == []
+
+
+def test_stale_if_none_match_returns_body(client, store):
+    store.put(USER_ID, "hello", 2)
+
+    response = _get(client, **{"If-None-Match": '"etag-1"'})
+
+    assert response.status_code == 200
+    assert response.data == b"hello"
+
+
+def test_if_modified_since_returns_304_without_download(client, store):
+    store.put(USER_ID, "hello", 1)
+
+    response = _get(client, **{"If-Modified-Since": "Thu, 01 Jan 2026 00:00:05 GMT"})
+
+    assert response.status_code == 304
+    assert store.downloads == []
+
+
+def test_missing_profile_returns_404(client, store):
+    response = _get(client)
+
+    assert response.status_code == 404
+
+
+def test_cache_hit_skips_download(client, store):
+    store.put(USER_ID, "hello", 1)
+
+    assert _get(client).data == b"hello"
+    assert _get(client).data == b"hello"
+
+    assert store.downloads == [1]
+
+
+def test_cache_is_refreshed_when_etag_changes(client, store):
+    store.put(USER_ID, "hello", 1)
+    assert _get(client).data == b"hello"
+
+    store.put(USER_ID, "updated", 2)
+    response = _get(client)
+
+    assert response.data == b"updated"
+    assert response.headers["ETag"] == '"etag-2-identity"'
+    assert store.downloads == [1, 2]
+    assert storage_handler._profile_cache[USER_ID]["etag"] == "etag-2"
+
+
+def test_rewrite_during_read_serves_new_generation(client, store):
+    store.put(USER_ID, "hello", 1)
+    store.before_download = lambda: store.put(USER_ID, "rewritten", 2)
+
+    response = _get(client, **{"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert gzip.decompress(response.data) == b"rewritten"
+    assert response.headers["ETag"] == '"etag-2"'
+    assert store.downloads == [1, 2]
+
+
+def test_delete_during_read_returns_404(client, store):
+    store.put(USER_ID, "hello", 1)
+    store.before_download = lambda: store.objects.clear()
+
+    response = _get(client)
+
+    assert response.status_code == 404
@@ -0,0 +1,208 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import GenerationScheduler, SchedulerRejected, SchedulerTimeout
+
+
+def _hold(scheduler, user_id, priority, order, release):
+    """Take a slot, record the grant order, and hold it until released."""
+    with scheduler.slot(user_id, priority):
+        order.append((user_id, priority))
+        release.wait(5)
+
+
+def _start(scheduler, user_id, priority, order, release):
+    thread = threading.Thread(target=_hold, args=(scheduler, user_id, priority, order, release))
+    thread.start()
+    return thread
+
+
+def _wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def _queued(scheduler):
+    return sum(lane["queued"] for lane in scheduler.stats()["lanes"].values())
+
+
+def _make_scheduler(**kwargs):
+    options = {
+        "max_concurrency": 1,
+        "max_per_user": 1,
+        "queue_timeout": 5,
+        "aging_interval": 0,
+        "interactive_reserved": 0,
+        "max_queued_per_user": 5,
+        "max_queued_per_lane": {"interactive": 5, "background": 5, "batch": 5},
+    }
+    options.update(kwargs)
+    return GenerationScheduler(**options)
+
+
+def test_higher_lane_is_served_first():
+    scheduler = _make_scheduler()
+    order, blocker, release = [], threading.Event(), threading.Event()
+
+    threads = [_start(scheduler, "holder", "interactive", order, blocker)]
+    _wait_for(lambda: order)
+    threads.append(_start(scheduler, "a", "batch", order, release))
+    threads.append(_start(scheduler, "b", "background", order, release))
+    threads.append(_start(scheduler, "c", "interactive", order, release))
+    _wait_for(lambda: _queued(scheduler) == 3)
+
+    blocker.set()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [lane for _, lane in order[1:]] == ["interactive", "background", "batch"]
+
+
+def test_users_are_served_round_robin_within_a_lane():
+    scheduler = _make_scheduler(max_per_user=5)
+    order, blocker, release = [], threading.Event(), threading.Event()
+
+    threads = [_start(scheduler, "holder", "batch", order, blocker)]
+    _wait_for(lambda: order)
+    for user_id in ("bulk", "bulk", "bulk", "other"):
+        threads.append(_start(scheduler, user_id, "batch", order, release))
+        _wait_for(lambda: _queued(scheduler) == len(threads) - 1)
+
+    blocker.set()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [user_id for user_id, _ in order[1:3]] == ["bulk", "other"]
+
+
+def test_per_user_cap_leaves_slots_for_other_users():
+    scheduler = _make_scheduler(max_concurrency=3, max_per_user=1)
+    order, release = [], threading.Event()
+
+    threads = [_start(scheduler, "bulk", "batch", order, release) for _ in range(2)]
+    _wait_for(lambda: len(order) == 1 and _queued(scheduler) == 1)
+    threads.append(_start(scheduler, "other", "interactive", order, release))
+    _wait_for(lambda: len(order) == 2)
+
+    assert scheduler.stats()["in_flight"] == 2
+    assert order[1] == ("other", "interactive")
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+
+def test_reserved_slot_keeps_interactive_immediate_under_batch_load():
+    scheduler = _make_scheduler(max_concurrency=4, max_per_user=2, interactive_reserved=1)
+    order, release = [], threading.Event()
+
+    threads = [_start(scheduler, user_id, "batch", order, release)
+               for user_id in ("bulk-a", "bulk-a", "bulk-b", "bulk-b")]
+    _wait_for(lambda: len(order) == 3 and _queued(scheduler) == 1)
+    assert scheduler.stats()["in_flight"] == 3
+
+    started = time.monotonic()
+    with scheduler.slot("user", "interactive"):
+        assert time.monotonic() - started < 0.1
+        assert scheduler.stats()["in_flight"] == 4
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(order) == 4
+
+
+def test_per_user_queue_limit_is_counted_per_lane():
+    scheduler = _make_scheduler(max_queued_per_user=1)
+    order, release = [], threading.Event()
+
+    threads = [_start(scheduler, "holder", "interactive", order, release)]
+    _wait_for(lambda: order)
+    threads.append(_start(scheduler, "bulk", "batch", order, release))
+    _wait_for(lambda: _queued(scheduler) == 1)
+
+    # The user's own queued batch request does not block their interactive one
+    threads.append(_start(scheduler, "bulk", "interactive", order, release))
+    _wait_for(lambda: _queued(scheduler) == 2)
+    assert scheduler.stats()["lanes"]["interactive"]["rejected"] == 0
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(order) == 3
+
+
+def test_queue_limits_reject_instead_of_waiting():
+    scheduler = _make_scheduler(max_queued_per_user=1, max_queued_per_lane={"batch": 1})
+    order, release = [], threading.Event()
+
+    threads = [_start(scheduler, "bulk", "batch", order, release)]
+    _wait_for(lambda: order)
+    threads.append(_start(scheduler, "bulk", "batch", order, release))
+    _wait_for(lambda: _queued(scheduler) == 1)
+
+    with pytest.raises(SchedulerRejected) as user_full:
+        with scheduler.slot("bulk", "batch"):
+            pass
+    assert user_full.value.status_code == 429
+
+    with pytest.raises(SchedulerRejected) as lane_full:
+        with scheduler.slot("other", "batch"):
+            pass
+    assert lane_full.value.status_code == 503
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    stats = scheduler.stats()["lanes"]["batch"]
+    assert stats["rejected"] == 2
+    assert stats["completed"] == 2
+    assert stats["queued"] == 0
+
+
+def test_timeout_removes_ticket_from_queue():
+    scheduler = _make_scheduler(queue_timeout=0.05)
+
+    with scheduler.slot("holder", "interactive"):
+        with pytest.raises(SchedulerTimeout):
+            with scheduler.slot("waiter", "batch"):
+                pass
+        assert _queued(scheduler) == 0
+
+    stats = scheduler.stats()
+    assert stats["in_flight"] == 0
+    assert stats["lanes"]["batch"]["timed_out"] == 1
+    # The timed-out wait is part of the lane's queue wait metric
+    assert stats["lanes"]["batch"]["queue_wait_p95"] >= 0.05
+
+    # The timed-out user is not left holding queue or slot capacity
+    with scheduler.slot("waiter", "batch"):
+        assert scheduler.stats()["in_flight"] == 1
+
+
+def test_aging_promotes_long_waiting_requests():
+    scheduler = _make_scheduler(aging_interval=0.05)
+    order, blocker, release = [], threading.Event(), threading.Event()
+
+    threads = [_start(scheduler, "holder", "interactive", order, blocker)]
+    _wait_for(lambda: order)
+    threads.append(_start(scheduler, "bulk", "batch", order, release))
+    _wait_for(lambda: _queued(scheduler) == 1)
+    time.sleep(0.12)
+    threads.append(_start(scheduler, "user", "interactive", order, release))
+    _wait_for(lambda: _queued(scheduler) == 2)
+
+    blocker.set()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert order[1] == ("bulk", "batch")